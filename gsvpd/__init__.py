@@ -13,19 +13,17 @@ Key features:
 Example usage::
 
     import asyncio
-    import aiohttp
-    from gsvpd import fetch_panos
+    from gsvpd import create_connector, fetch_panos
     from gsvpd import timer
     from rich import print
 
     async def main():
         dataset = ["list of pano ids"]
         sem_pano = asyncio.Semaphore(100)
-        sem_tile = asyncio.Semaphore(100)
-        connector = aiohttp.TCPConnector(limit=100, limit_per_host=100)
         zoom_level = 2
         workers = 5
-        return await fetch_panos(sem_pano, sem_tile, connector, workers, zoom_level, dataset)
+        connector = create_connector(limit=100, limit_per_host=100)
+        return await fetch_panos(sem_pano, connector, workers, zoom_level, dataset)
 
     with timer() as t:
         total_panos, successful_panos, output_dir = asyncio.run(main())
@@ -6,6 +6,9 @@ OLD_ZOOM_SIZES: Pre-2016 panorama sizes.
 TILES_AXIS_COUNT: Number of tiles along X and Y axes per zoom level.
 TILE_COUNT_TO_SIZE: Mapping of tile counts to panorama dimensions.
 TILE_SIZE: Tile dimension in pixels (square tiles).
+BLACK_TILE_SIZES: Known Content-Length values of Google's all-black tile payloads.
+RATE_LIMIT_STATUSES: HTTP statuses that pause all tile requests before retrying.
+MAX_RETRY_AFTER: Upper bound in seconds on a rate limit pause.
 """
 
 # year > 2016 
@@ -52,4 +55,18 @@ TILE_COUNT_TO_SIZE = {
     (26, 13): (13312, 6656)  # z5 old
 }
 
-TILE_SIZE = 512
\ No newline at end of file
+# Same mapping keyed by (x_tiles << 8) | y_tiles, avoids hashing a tuple per lookup.
+# Tile counts never exceed 255, so the packed keys can't collide.
+_TILE_COUNT_TO_SIZE_PACKED = {(x << 8) | y: size for (x, y), size in TILE_COUNT_TO_SIZE.items()}
+
+TILE_SIZE = 512
+
+# Content-Length (bytes) of the all-black tiles Google serves for missing areas.
+# Tiles with these sizes are skipped before their body is downloaded.
+BLACK_TILE_SIZES = frozenset({1184})
+
+# HTTP statuses Google uses to signal throttling, honoured via the Retry-After header.
+RATE_LIMIT_STATUSES = frozenset({429, 503})
+
+# Longest pause (seconds) honoured from a Retry-After header.
+MAX_RETRY_AFTER = 60
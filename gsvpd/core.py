@@ -3,14 +3,18 @@ Core module for downloading, processing, and stitching Google Street View panora
 
 This module provides asynchronous functions to:
 
+- Limit concurrent panoramas adaptively based on rate limiting (`AdaptiveSemaphore`).
+- Build the per-panorama tile URL prefix (`tile_base_url`).
 - Fetch individual panorama tiles from Google Street View with retry logic (`fetch_tile`).
 - Determine panorama dimensions based on zoom level and tile content (`determine_dimensions`).
 - Stitch multiple tiles into a single panorama image (`stitch_tiles`).
 - Process a single panorama by fetching tiles, determining dimensions, stitching, and saving (`process_panoid`).
+- Create a keep-alive tuned connection pool for the tile server (`create_connector`).
 - Download and process multiple panoramas concurrently (`fetch_panos`).
 
 The module supports different zoom levels (0–5) and handles old (pre-2016) and new panorama formats.
-It uses asyncio for concurrent network requests and a process pool executor for CPU-bound tasks like image analysis.
+It uses asyncio for concurrent network requests and a thread pool executor for CPU-bound tasks like image
+analysis, stitching and JPEG encoding (NumPy and PIL release the GIL for this work).
 
 Dependencies:
 - aiohttp for asynchronous HTTP requests
@@ -18,7 +22,8 @@ Dependencies:
 - rich for colored logging
 """
 import asyncio
-from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import aiohttp
 from aiohttp import ClientTimeout
@@ -27,15 +32,19 @@ from PIL import Image
 from io import BytesIO
 
 from rich import print
-from typing import Tuple, Union
+from typing import Iterable, Tuple, Union
 import os
 
 from .constants import (
     ZOOM_SIZES, 
     OLD_ZOOM_SIZES, 
     TILE_COUNT_TO_SIZE,
+    _TILE_COUNT_TO_SIZE_PACKED,
     TILES_AXIS_COUNT,
-    TILE_SIZE
+    TILE_SIZE,
+    BLACK_TILE_SIZES,
+    RATE_LIMIT_STATUSES,
+    MAX_RETRY_AFTER
 )
 from .my_utils import (
     has_black_bottom,
@@ -44,6 +53,101 @@ from .my_utils import (
 )
 
 
+class AdaptiveSemaphore:
+    """
+    Concurrency limiter whose limit adapts to server load (AIMD).
+
+    Drop-in for the `sem_pano` semaphore: used with `async with`, but the number
+    of holders allowed at once moves between `min_limit` and `max_limit`:
+
+    - `increase()` (called per successful panorama) raises the limit by 1.
+    - `decrease()` (called when the server rate limits with 429/503) multiplies
+      it by `decrease_factor`.
+
+    Usage:
+        sem_pano = AdaptiveSemaphore(max_limit=100, initial_limit=8)
+        await fetch_panos(sem_pano, connector, workers, zoom_level, dataset)
+    """
+
+    def __init__(
+        self, 
+        max_limit: int, 
+        min_limit: int = 1, 
+        initial_limit: Union[int, None] = None, 
+        decrease_factor: float = 0.5
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        start = max_limit if initial_limit is None else initial_limit
+        self.limit = float(min(max(start, self.min_limit), max_limit))
+        self.decrease_factor = decrease_factor
+        self._in_flight = 0
+        self._waiters = deque()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *args):
+        self.release()
+        return False
+
+    async def acquire(self) -> None:
+        while self._in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # pass a wake-up we were given but can't use on to the next waiter
+                if waiter.done() and not waiter.cancelled():
+                    self._wake_waiters()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self._in_flight += 1
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self._wake_waiters()
+
+    def increase(self) -> None:
+        self.limit = min(self.max_limit, self.limit + 1)
+        self._wake_waiters()
+
+    def decrease(self) -> None:
+        # holders above the new limit finish normally, new ones just wait longer
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+    def _wake_waiters(self) -> None:
+        free = int(self.limit) - self._in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+# Fail slow TCP/TLS handshakes fast; not `connect`, which also covers waiting for a
+# free pool slot and would fail tiles queued behind a busy connector. 30s overall cap per tile
+TILE_TIMEOUT = ClientTimeout(total=30, sock_connect=5, sock_read=15)
+
+
+def tile_base_url(panoid: str, zoom_level: int) -> str:
+    """
+    Build the tile URL shared by every tile of a panorama, without the x/y query.
+
+    Args:
+        panoid (str): The panorama ID.
+        zoom_level (int): Zoom level (0–5).
+
+    Returns:
+        str: URL prefix to which `&x=..&y=..` is appended.
+    """
+    return f"https://cbk0.google.com/cbk?output=tile&panoid={panoid}&zoom={zoom_level}"
+
+
 async def fetch_tile(
     session: aiohttp.ClientSession, 
     panoid: str,
@@ -51,7 +155,10 @@ async def fetch_tile(
     y: int, 
     zoom_level: int, 
     retries: int = 3, 
-    backoff: float = 0.2
+    backoff: float = 0.2,
+    base_url: Union[str, None] = None,
+    rate_limit_gate: Union[asyncio.Event, None] = None,
+    limiter: Union[AdaptiveSemaphore, None] = None
 ) -> Union[None, Tuple]:
     """
     Fetch a single panorama tile from Google Street View with retry support.
@@ -64,28 +171,56 @@ async def fetch_tile(
         zoom_level (int): Zoom level (0–5).
         retries (int): Number of retry attempts on failure (default: 3).
         backoff (float): Initial backoff delay in seconds between retries (default: 1.0).
+        base_url (str | None): Prebuilt tile URL for this panoid and zoom level, without x/y.
+            Built from `panoid` and `zoom_level` if None.
+        rate_limit_gate (asyncio.Event | None): Shared gate that is cleared while the server
+            is rate limiting (429/503). Every request waits on it before being sent.
+            Without a gate, rate limited requests just sleep for `Retry-After`.
+        limiter (AdaptiveSemaphore | None): Limiter to shrink when the server rate limits.
+            With a gate, it is shrunk once per rate limit pause rather than per tile.
 
     Returns:
         tuple[int, int, PIL.Image.Image] | None: 
             A tuple containing (x, y, tile image) if successful, otherwise None.
     """
-    url = f"https://cbk0.google.com/cbk?output=tile&panoid={panoid}&zoom={zoom_level}&x={x}&y={y}"
+    if base_url is None:
+        base_url = tile_base_url(panoid, zoom_level)
+    url = f"{base_url}&x={x}&y={y}"
 
     for attempt in range(1, retries + 1):
+        if rate_limit_gate is not None:
+            await rate_limit_gate.wait()
+
         try:
-            async with session.get(url, timeout=ClientTimeout(30)) as response:
+            async with session.get(url, timeout=TILE_TIMEOUT) as response:
+
+                if response.status in RATE_LIMIT_STATUSES:
+                    default_wait = backoff * (2 ** (attempt - 1))
+                    wait_time = _retry_after(response.headers.get("Retry-After"), default_wait)
+                    if limiter is not None and (rate_limit_gate is None or rate_limit_gate.is_set()):
+                        limiter.decrease()
+                    # pause even on the last attempt, so concurrent 429s see the gate
+                    # closed and the limiter is only shrunk once per pause
+                    if rate_limit_gate is not None:
+                        _pause_requests(rate_limit_gate, wait_time)
+                    if attempt == retries:
+                        print(f"[red][TILE ERROR] Rate limited after {retries} retries for tile {x},{y} pano `{panoid}`[/]")
+                        return None
+                    print(f"[yellow][Rate Limit] {attempt}/{retries} for tile ({x},{y}) pano `{panoid}`, pausing {wait_time:.1f}s[/]")
+                    if rate_limit_gate is None:
+                        await asyncio.sleep(wait_time)
+                    continue
 
                 if response.status != 200:
                     return None
 
-                BLACK_TILE_BYTE_SIZE = 1184
-                BLACK_TILE_SIZE = int(response.headers.get("Content-Length", 0))
-
-                if BLACK_TILE_SIZE == BLACK_TILE_BYTE_SIZE:  # black tile
+                # black tile, the context exit releases the connection without reading the body
+                if int(response.headers.get("Content-Length", 0)) in BLACK_TILE_SIZES:
                     return None
 
-                data = await response.read()
-                tile = Image.open(BytesIO(data))
+                # Lazy open: only the compressed bytes are kept, decoding happens
+                # in the executor when the tile is stitched
+                tile = Image.open(BytesIO(await response.read()))
                 return (x, y, tile)
 
         except Exception as error:
@@ -98,6 +233,32 @@ async def fetch_tile(
 
     return None
 
+
+def _retry_after(value: Union[str, None], default: float) -> float:
+    """
+    Parse a `Retry-After` header given as delay-seconds, falling back to `default`.
+
+    The result is clamped to `MAX_RETRY_AFTER` so a bogus header can't close the
+    shared rate limit gate for the rest of the run.
+    """
+    try:
+        seconds = int(value)
+    except (TypeError, ValueError):
+        seconds = default
+    return min(max(0, seconds), MAX_RETRY_AFTER)
+
+
+def _pause_requests(rate_limit_gate: asyncio.Event, wait_time: float) -> None:
+    """
+    Close the shared rate limit gate and reopen it after `wait_time` seconds.
+
+    If the gate is already closed, the pause already scheduled is left as is.
+    """
+    if rate_limit_gate.is_set():
+        rate_limit_gate.clear()
+        asyncio.get_running_loop().call_later(wait_time, rate_limit_gate.set)
+
+
 async def determine_dimensions(
     executor,
     tiles: list, 
@@ -113,11 +274,12 @@ async def determine_dimensions(
         - Uses `black_percentage` to check if it's an old panorama.
     For zoom levels 1–2:
         - Uses `has_black_bottom` to detect old panorama bottom margin.
+          The tile is decoded and cropped to its bottom strip in the executor.
     For zoom levels 3+:
         - Uses `TILE_COUNT_TO_SIZE` lookup.
 
     Args:
-        executor (ProcessPoolExecutor | None): Executor for CPU-bound tasks.
+        executor (ThreadPoolExecutor | None): Executor for CPU-bound tasks.
         tiles (list): List of tiles in the format [(x, y, Image), ...].
         zoom_level (int): Zoom level (0–5).
         x_tiles_count (int): Number of horizontal tiles fetched.
@@ -126,19 +288,23 @@ async def determine_dimensions(
     Returns:
         Tuple[int, int]: Width and height of the panorama in pixels.
     """
+    loop = asyncio.get_running_loop()
+
     if zoom_level == 0:
-        black_perc = await asyncio.get_running_loop().run_in_executor(
+        black_perc = await loop.run_in_executor(
             executor, black_percentage, tiles[0][2]
         )
         return OLD_ZOOM_SIZES[zoom_level] if black_perc > 55 else ZOOM_SIZES[zoom_level]
 
     elif 0 < zoom_level <= 2:
-        black = await asyncio.get_running_loop().run_in_executor(
+        # has_black_bottom crops the bottom rows itself, so the (lazy) tile is
+        # decoded in the executor rather than on the event loop
+        black = await loop.run_in_executor(
             executor, has_black_bottom, tiles[1][2]
         )
         return OLD_ZOOM_SIZES[zoom_level] if black else ZOOM_SIZES[zoom_level]
 
-    return TILE_COUNT_TO_SIZE.get((x_tiles_count, y_tiles_count))
+    return _TILE_COUNT_TO_SIZE_PACKED.get((x_tiles_count << 8) | y_tiles_count)
 
 
 def stitch_tiles(tiles: list, width: int, height: int) -> Image.Image:
@@ -155,18 +321,47 @@ def stitch_tiles(tiles: list, width: int, height: int) -> Image.Image:
     """
     full_img = Image.new("RGB", (width, height))
     for x, y, tile in tiles:
+        # paste decodes the (lazy) tile, copies it in C and clips edge tiles;
+        # close it right after so only one decoded tile is alive at a time
         full_img.paste(tile, (x * TILE_SIZE, y * TILE_SIZE))
         tile.close()
     return full_img
 
 
+def _stitch_and_save(
+    tiles: list, 
+    width: int, 
+    height: int, 
+    output_dir: str, 
+    panoid: str, 
+    zoom_level: int
+) -> Tuple[str, Tuple[int, int]]:
+    """
+    Stitch tiles and save the resulting panorama in one blocking call.
+
+    Meant to run in a thread pool so stitching and JPEG encoding don't
+    block the event loop.
+
+    Returns:
+        Tuple[str, Tuple[int, int]]: Human-readable file size and (width, height) of the image.
+    """
+    full_img = stitch_tiles(tiles, width, height)
+    try:
+        img_file_size = save_img(full_img, output_dir, panoid, zoom_level)
+        return img_file_size, full_img.size
+    finally:
+        full_img.close()
+
+
 async def process_panoid(
     session: aiohttp.ClientSession, 
     panoid: str, 
-    sem_pano: asyncio.Semaphore, 
-    executor: ProcessPoolExecutor, 
+    sem_pano: Union[asyncio.Semaphore, AdaptiveSemaphore], 
+    executor: ThreadPoolExecutor, 
     zoom_level: int, 
-    output_dir: str
+    output_dir: str,
+    tile_concurrency: int = 16,
+    rate_limit_gate: Union[asyncio.Event, None] = None
 ) -> Union[dict, None]:
     """
     Download, reconstruct, and save a single panorama.
@@ -182,10 +377,13 @@ async def process_panoid(
     Args:
         session (aiohttp.ClientSession): Active HTTP session.
         panoid (str): Panorama ID to fetch.
-        sem_pano (asyncio.Semaphore): Semaphore to limit concurrent panorama downloads.
-        executor (ProcessPoolExecutor): Executor for CPU-bound tasks.
+        sem_pano (asyncio.Semaphore | AdaptiveSemaphore): Semaphore to limit concurrent panorama
+            downloads. An `AdaptiveSemaphore` grows on each success and shrinks on rate limiting.
+        executor (ThreadPoolExecutor): Executor for CPU-bound tasks (black checks, stitching and saving).
         zoom_level (int): Zoom level (0–5).
         output_dir (str): Directory to save the panorama image.
+        tile_concurrency (int): Max concurrent tile requests for this panorama (default: 16).
+        rate_limit_gate (asyncio.Event | None): Shared rate limit gate passed to `fetch_tile`.
 
     Returns:
         dict | None: Metadata dictionary containing:
@@ -196,37 +394,57 @@ async def process_panoid(
             - "file_size" (int): Size of saved image in bytes.
         Returns None if the panorama could not be fetched or processed.
      """
+    limiter = sem_pano if isinstance(sem_pano, AdaptiveSemaphore) else None
+
     try:
         async with sem_pano:
             # Number of tiles along the X (horizontal) and Y (vertical) axes
             # This defines how many tile requests are needed for this zoom level
             tiles_x, tiles_y = TILES_AXIS_COUNT[zoom_level]
 
-            # fetch tiles
+            # fetch tiles, bounded per pano so large zoom levels pipeline instead of flooding
+            sem_tile = asyncio.Semaphore(tile_concurrency)
+            base_url = tile_base_url(panoid, zoom_level)
+
+            async def bounded_fetch_tile(x: int, y: int) -> Union[None, Tuple]:
+                async with sem_tile:
+                    return await fetch_tile(
+                        session, panoid, x, y, zoom_level,
+                        base_url=base_url, rate_limit_gate=rate_limit_gate, limiter=limiter
+                    )
+
+            # gather keeps (x, y) order, determine_dimensions relies on it
             tasks = [
-                fetch_tile(session, panoid, x, y, zoom_level)
+                bounded_fetch_tile(x, y)
                 for x in range(tiles_x + 1)
                 for y in range(tiles_y + 1)
             ]
-            tiles = [tile for tile in await asyncio.gather(*tasks) if tile is not None]
+            # filter out missing tiles and track the grid extent in the same pass
+            tiles = []
+            max_x = max_y = -1
+            for tile in await asyncio.gather(*tasks):
+                if tile is None:
+                    continue
+                tiles.append(tile)
+                if tile[0] > max_x: max_x = tile[0]
+                if tile[1] > max_y: max_y = tile[1]
 
             if not tiles:
                 print(f"[yellow][FAIL] Panoid `{panoid}` | No tiles fetched (may be expired, removed, or invalid)[/]")
                 return None
 
-            # count tiles
-            x_values = {x for x, _, _ in tiles}
-            y_values = {y for _, y, _ in tiles}
-            x_tiles_count, y_tiles_count = len(x_values), len(y_values)
+            # count tiles, the grid is dense from (0, 0) so the extent is the count
+            x_tiles_count, y_tiles_count = max_x + 1, max_y + 1
 
             # determine panorama dimensions
             w, h = await determine_dimensions(executor, tiles, zoom_level, x_tiles_count, y_tiles_count)
 
-            # stitch & save
-            full_img = stitch_tiles(tiles, w, h)
-            img_file_size = save_img(full_img, output_dir, panoid, zoom_level)
-            img_size = full_img.size
-            full_img.close()
+            # stitch & save off the event loop
+            img_file_size, img_size = await asyncio.get_running_loop().run_in_executor(
+                executor, _stitch_and_save, tiles, w, h, output_dir, panoid, zoom_level
+            )
+            if limiter is not None:
+                limiter.increase()
 
             print(
                 f"[green][OK] Panoid `{panoid}` | zoom {zoom_level} "
@@ -246,28 +464,71 @@ async def process_panoid(
         print(f"[red][PROCESSING ERROR] Panoid `{panoid}`: {error}[/]")
         return None
 
+def create_connector(limit_per_host: int = 100, limit: int = 100) -> aiohttp.TCPConnector:
+    """
+    Create a TCP connector tuned for many small requests to a single tile host.
+
+    DNS results are cached and idle keep-alive connections are held long enough
+    to survive the gaps between tile bursts, so connections to the tile server
+    are reused instead of paying a new TLS handshake. Happy Eyeballs is disabled
+    so each new connection makes a single connect attempt.
+
+    Args:
+        limit_per_host (int): Maximum connections per host (default: 100).
+        limit (int): Maximum total connections (default: 100).
+
+    Returns:
+        aiohttp.TCPConnector: The configured connector.
+    """
+    return aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        use_dns_cache=True,
+        ttl_dns_cache=600,
+        keepalive_timeout=75,
+        force_close=False,
+        enable_cleanup_closed=True,
+        happy_eyeballs_delay=None,
+    )
+
+
 async def fetch_panos(
-    sem_pano: asyncio.Semaphore, 
-    connector: aiohttp.TCPConnector, 
+    sem_pano: Union[asyncio.Semaphore, AdaptiveSemaphore], 
+    connector: Union[aiohttp.TCPConnector, None], 
     max_workers: int, 
     zoom_level: int, 
-    panoids: list[str], 
-    output_dir: Union[str, None] =  None
+    panoids: Iterable[str], 
+    output_dir: Union[str, None] =  None,
+    tile_concurrency: int = 16,
+    pano_workers: int = 100,
+    close_connector: bool = True
 ) -> tuple[int, int, str]:
    """
     Download and process multiple panoramas concurrently.
 
     Args:
-        sem_pano (asyncio.Semaphore): Semaphore to control concurrent pano downloads.
-        connector (aiohttp.TCPConnector): Connector with concurrency limits for aiohttp.
-        max_workers (int): Max number of workers for the process pool (used for image checks).
+        sem_pano (asyncio.Semaphore | AdaptiveSemaphore): Semaphore to control concurrent pano
+            downloads. Pass an `AdaptiveSemaphore` to adapt the limit to rate limiting.
+        connector (aiohttp.TCPConnector | None): Connector with concurrency limits for aiohttp.
+            Uses `create_connector()` if None.
+        max_workers (int): Max number of threads for the executor (image checks, stitching and saving).
         zoom_level (int): Zoom level (0–5).
-        panoids (list[str]): List of panorama IDs to fetch.
+        panoids (Iterable[str]): Panorama IDs to fetch. Consumed lazily, so a generator
+            or `itertools.islice` works without materializing a list.
+        output_dir (str | None): Directory to save panoramas in (default: current working directory).
+        tile_concurrency (int): Max concurrent tile requests per panorama (default: 16).
+        pano_workers (int): Number of worker tasks pulling panoids from the queue (default: 100).
+            Should be at least the `sem_pano` limit so the semaphore stays saturated.
+        close_connector (bool): Close the connector when done (default: True). Pass False to
+            reuse a connector across calls; the caller then closes it.
 
     Workflow:
         - Creates an aiohttp session.
-        - Uses a process pool executor for CPU-bound tasks.
-        - Runs `process_panoid()` for each panoid concurrently.
+        - Uses a thread pool executor for image analysis, stitching and saving.
+        - Shares one rate limit gate so a 429/503 pauses every tile request, not just one.
+        - Streams the panoids through a bounded queue to a fixed pool of worker tasks
+          running `process_panoid()`, so memory stays proportional to the workers,
+          not the dataset.
 
     Returns:
         tuple[int, int, str]: A tuple containing:
@@ -278,13 +539,47 @@ async def fetch_panos(
    print("[green]| Running Scraper..[/]\n")
 
    if output_dir is None: output_dir = os.getcwd()
-
-   async with aiohttp.ClientSession(connector=connector) as session:
-        with ProcessPoolExecutor(max_workers=max_workers) as executor:
-            tasks = [process_panoid(session, panoid, sem_pano, executor, zoom_level, output_dir) for panoid in panoids]
-            tasks_res = await asyncio.gather(*tasks)
-
-        success_panos = tuple(filter(lambda pano: pano is not None, tasks_res)) 
-
-        return len(tasks) ,len(success_panos), output_dir
+   if connector is None: connector = create_connector()
+
+   # open by default, cleared by fetch_tile while the server is rate limiting
+   rate_limit_gate = asyncio.Event()
+   rate_limit_gate.set()
+
+   # bounded so the producer only stays a little ahead of the workers
+   queue = asyncio.Queue(maxsize=pano_workers)
+
+   async def produce_panoids() -> int:
+       total = 0
+       try:
+           for panoid in panoids:
+               await queue.put(panoid)
+               total += 1
+       finally:
+           # one stop marker per worker, even if iterating the panoids failed
+           for _ in range(pano_workers):
+               await queue.put(None)
+       return total
+
+   async with aiohttp.ClientSession(connector=connector, connector_owner=close_connector) as session:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            async def pano_worker() -> int:
+                # only count successes, the per-pano metadata isn't kept around
+                successful = 0
+                while True:
+                    panoid = await queue.get()
+                    if panoid is None:
+                        return successful
+                    result = await process_panoid(
+                        session, panoid, sem_pano, executor, zoom_level, output_dir,
+                        tile_concurrency=tile_concurrency, rate_limit_gate=rate_limit_gate
+                    )
+                    if result is not None:
+                        successful += 1
+
+            workers = [asyncio.create_task(pano_worker()) for _ in range(pano_workers)]
+            total_panos, *worker_successes = await asyncio.gather(produce_panoids(), *workers)
+            success_panos = sum(worker_successes)
+
+        return total_panos, success_panos, output_dir
 
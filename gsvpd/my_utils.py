@@ -40,13 +40,14 @@ class timer:
     """
 
     def __enter__(self):
-        self.start = time.time()
+        # perf_counter is monotonic, so wall-clock adjustments can't skew the result
+        self.start = time.perf_counter()
         self.time_elapsed = None
         return self
 
 
     def __exit__(self, *args):
-        self.end = time.time()
+        self.end = time.perf_counter()
         self.interval = self.end - self.start
         hrs, rem = divmod(self.interval, 3600)
         mins, secs = divmod(rem, 60)
@@ -65,9 +66,11 @@ def has_black_bottom(tile, black_threshold: int = 10, check_rows: int = 5) -> bo
     Returns:
         bool: True if all bottom rows are black, False otherwise.
     """
-    arr = np.array(tile)
-    bottom = arr[-check_rows:]
-    return np.all(bottom <= black_threshold)
+    # Only the bottom strip is needed, so crop before touching pixel data
+    w, h = tile.size
+    bottom = tile.crop((0, h - check_rows, w, h))
+    buf = np.frombuffer(bottom.tobytes(), dtype=np.uint8)
+    return bool((buf <= black_threshold).all())
 
 
 def black_percentage(tile, threshold: int = 10) -> float:
@@ -81,14 +84,15 @@ def black_percentage(tile, threshold: int = 10) -> float:
     Returns:
         float: Percentage of black pixels (0–100).
     """
-    img_np = np.array(tile)
+    # A pixel can only be black if every channel dips to the threshold somewhere;
+    # getextrema() runs in PIL's C code and lets us skip the array entirely.
+    if any(ch_min > threshold for ch_min, _ in tile.getextrema()):
+        return 0.0
 
-    # Pixel is black if all channels <= threshold
-    black_pixels = np.all(img_np <= threshold, axis=2)
+    img_np = np.asarray(tile, dtype=np.uint8)
 
-    # Compute percentage
-    percent_black = np.sum(black_pixels) / black_pixels.size * 100
-    return percent_black
+    # Pixel is black if its brightest channel <= threshold
+    return float((img_np.max(axis=2) <= threshold).mean()) * 100.0
 
 
 def open_dataset(dataset_location: str) -> list[str]:
@@ -113,8 +117,9 @@ def parse_args():
     Arguments:
         --zoom (int, optional): Zoom level (0–5). (Default: 2)
         --dataset (str, required): Path to dataset JSON file. (Default: ./dataset.json)
-        --max-pano (int, optional): Max concurrent pano downloads. (Default: 50)
-        --workers (int, optional): Max process pool workers. (Default: 5)
+        --max-pano (int, optional): Upper bound on concurrent pano downloads. (Default: 50)
+        --max-tile (int, optional): Max concurrent tile downloads per pano. (Default: 16)
+        --workers (int, optional): Max worker threads. (Default: 5)
         --limit (int, optional): Limit panoids for testing. (Default: None)
         --conn-limit (int, optional): Maximum TCP connections per host (default: 100)
 
@@ -127,8 +132,9 @@ def parse_args():
 
     parser.add_argument("--zoom", type=int, default=2, help="Zoom level (0-5)")
     parser.add_argument("--dataset", type=str, required=True, default="./dataset.json", help="Path to dataset.json")
-    parser.add_argument("--max-pano", type=int, default=50, help="Max concurrent pano downloads")
-    parser.add_argument("--workers", type=int, default=5, help="Max process pool workers")
+    parser.add_argument("--max-pano", type=int, default=50, help="Upper bound on concurrent pano downloads (adapts to rate limiting)")
+    parser.add_argument("--max-tile", type=int, default=16, help="Max concurrent tile downloads per pano")
+    parser.add_argument("--workers", type=int, default=5, help="Max worker threads")
     parser.add_argument("--limit", type=int, default=None, help="Limit panoids")
     parser.add_argument("--output", type=str, default=os.getcwd(), help="Output directory (default: current working directory)")
     parser.add_argument("--conn-limit", type=int, default=100, help="Maximum TCP connections per host (default: 100)")
@@ -147,18 +153,21 @@ def format_size(num_bytes: int) -> str:
     Returns:
         str: Formatted size (e.g., '512.00 KB', '384.00 MB').
     """
-    for unit in ["B", "KB", "MB", "GB", "TB"]:
-        if num_bytes < 1024:
-            return f"{num_bytes:.2f} {unit}"
-        num_bytes /= 1024
-    return f"{num_bytes:.2f} PB"
+    units = ("B", "KB", "MB", "GB", "TB", "PB")
+    if num_bytes < 1:
+        return f"{num_bytes:.2f} B"
+
+    # Each unit is 2**10 bytes, so the bit length picks the unit directly
+    i = min(len(units) - 1, (int(num_bytes).bit_length() - 1) // 10)
+    return f"{num_bytes / (1 << (10 * i)):.2f} {units[i]}"
 
 def save_img(full_img: Image.Image, output_dir: str, panoid: str, zoom_level: int) -> str:
     """
     Save a PIL image to disk in a structured directory layout and return its file size.
 
     The function creates a subdirectory based on the zoom level (e.g., "panos_z1"),
-    saves the given image as a JPEG file named with the provided panorama ID, and
+    saves the given image as a JPEG file (quality 85, 4:2:0 chroma subsampling)
+    named with the provided panorama ID, and
     calculates the saved file's size in a human-readable format.
 
     Args:
@@ -175,7 +184,9 @@ def save_img(full_img: Image.Image, output_dir: str, panoid: str, zoom_level: in
     os.makedirs(zoom_output_folder, exist_ok=True) 
     out_path = os.path.join(zoom_output_folder, f"{panoid}.jpg")
 
-    full_img.save(out_path)
+    # Explicit encoder settings keep encode time and file size predictable
+    # across Pillow versions (subsampling=2 is 4:2:0 chroma)
+    full_img.save(out_path, "JPEG", quality=85, subsampling=2, optimize=False, progressive=False)
     file_size_bytes = os.path.getsize(out_path)
     file_size_fmt = format_size(file_size_bytes)
 
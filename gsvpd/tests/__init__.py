@@ -14,4 +14,11 @@ Usage:
 
     # Run a specific test file
     pytest gsvpd/tests/test_core.py
+
+    # Run the slow variants (e.g. every zoom level)
+    pytest gsvpd/tests -m slow
+
+    # Run in parallel with pytest-xdist, keeping each file on one worker
+    # so module-scoped fixtures (event loop, connector) are built once
+    pytest gsvpd/tests -n auto --dist loadfile
 """
\ No newline at end of file
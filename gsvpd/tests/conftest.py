@@ -0,0 +1,25 @@
+"""
+Shared pytest configuration for the `gsvpd` test suite.
+
+- Registers the `slow` marker for exhaustive test variants (e.g. every zoom level).
+- Skips `slow` tests unless they are selected explicitly with `-m slow`.
+
+Usage:
+    pytest gsvpd/tests            # fast subset
+    pytest gsvpd/tests -m slow    # only the slow variants
+"""
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: exhaustive variant, skipped unless selected with `-m slow`")
+
+
+def pytest_collection_modifyitems(config, items):
+    if "slow" in (config.getoption("markexpr") or ""):
+        return
+
+    skip_slow = pytest.mark.skip(reason="slow variant, run with `-m slow`")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
@@ -15,31 +15,45 @@ This test suite covers:
 
 Utilities:
 - `dummy_image` and `dummy_image_bytes` provide in-memory images for testing.
+- `fake_save_img` replaces `save_img` where only the output path matters.
 
 The tests use:
 - `pytest` with `pytest.mark.asyncio` for async test support.
 - `unittest.mock` and `monkeypatch` for patching async HTTP calls and
   internal functions.
+- Duck-typed sessions (`SimpleNamespace(get=...)`) instead of real
+  `aiohttp.ClientSession` objects, so no connector is built.
 - `tmp_path` fixtures to test file writing without polluting the filesystem.
+- A module-scoped `shared_connector` fixture (and event loop) for the
+  `fetch_panos` tests.
 
 Usage:
     pytest gsvpd/tests/test_core.py
 """
 import pytest
+import pytest_asyncio
 import asyncio
+import functools
 from PIL import Image
 from io import BytesIO
+from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, patch 
 from ..core import TILE_COUNT_TO_SIZE
+from ..my_utils import format_size, save_img
 from .. import core
 
 
-def dummy_image_bytes(size=(256, 256), color=(255, 0, 0)):
+@functools.lru_cache(maxsize=32)
+def dummy_image_bytes(size=(1, 1), color=(255, 0, 0)):
     """
     Generate dummy image bytes for testing.
 
+    Cached per (size, color) so each JPEG is only encoded once per session.
+
     Args:
-        size (tuple[int, int]): Width and height of the image.
+        size (tuple[int, int]): Width and height of the image (default: 1x1).
+            Pass the real tile size where stitched dimensions matter.
         color (tuple[int, int, int]): RGB color of the image.
 
     Returns:
@@ -51,12 +65,16 @@ def dummy_image_bytes(size=(256, 256), color=(255, 0, 0)):
     return buf.read()
 
 
-def dummy_image(size=(256, 256), color=(255, 0, 0)):
+def dummy_image(size=(1, 1), color=(255, 0, 0)):
     """
     Generate a PIL Image object for testing.
 
+    Not cached: `stitch_tiles` closes every tile it pastes, so a shared
+    image would be unusable after the first stitched panorama.
+
     Args:
-        size (tuple[int, int]): Width and height of the image.
+        size (tuple[int, int]): Width and height of the image (default: 1x1).
+            Pass the real tile size where stitched dimensions matter.
         color (tuple[int, int, int]): RGB color of the image.
 
     Returns:
@@ -65,15 +83,29 @@ def dummy_image(size=(256, 256), color=(255, 0, 0)):
     return Image.new('RGB', size, color)
 
 
+def fake_save_img(full_img, output_dir, panoid, zoom_level):
+    """
+    Stand-in for `save_img` that creates an empty output file without encoding.
+
+    Lets tests assert on the output path at no JPEG encode/write cost;
+    `test_process_panoid_success` still goes through the real `save_img`.
+
+    Returns:
+        str: Formatted size of the empty file.
+    """
+    out_path = Path(output_dir) / f"panos_z{zoom_level}" / f"{panoid}.jpg"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.touch()
+    return format_size(0)
+
+
 @pytest.mark.asyncio
-async def test_fetch_tile_success_mocked(monkeypatch):
+async def test_fetch_tile_success_mocked():
     """
     Test fetch_tile with a successful mocked HTTP response.
 
     Ensures that fetch_tile returns a tuple (x, y, Image) for a valid tile.
     """
-    sem = asyncio.Semaphore(1)
-
     class MockResponse:
         status = 200
         headers = {"Content-Length": "1024"}
@@ -90,24 +122,22 @@ async def test_fetch_tile_success_mocked(monkeypatch):
     def mock_get(*args, **kwargs):
         return MockResponse()
 
-    async with core.aiohttp.ClientSession() as session:
-        monkeypatch.setattr(session, "get", mock_get)
-        result = await core.fetch_tile(session, "fake_panoid", 0, 0, sem, 3)
-        assert result is not None
-        x, y, img = result
-        assert x == 0 and y == 0
-        assert isinstance(img, Image.Image)
+    # duck-typed session, no connector/resolver/SSL setup needed
+    session = SimpleNamespace(get=mock_get)
+    result = await core.fetch_tile(session, "fake_panoid", 0, 0, 3)
+    assert result is not None
+    x, y, img = result
+    assert x == 0 and y == 0
+    assert isinstance(img, Image.Image)
 
 
 @pytest.mark.asyncio
-async def test_fetch_tile_black_tile_mocked(monkeypatch):
+async def test_fetch_tile_black_tile_mocked():
     """
     Test fetch_tile handling of a black tile.
 
     If the tile size matches the black tile byte size, fetch_tile should return None.
     """
-    sem = asyncio.Semaphore(1)
-
     class MockResponse:
         status = 200
         headers = {"Content-Length": "1184"}
@@ -124,26 +154,178 @@ async def test_fetch_tile_black_tile_mocked(monkeypatch):
     def mock_get(*args, **kwargs):
         return MockResponse()
 
-    async with core.aiohttp.ClientSession() as session:
-        monkeypatch.setattr(session, "get", mock_get)
-        result = await core.fetch_tile(session, "fake_panoid", 0, 0, sem, 3)
-        assert result is None
+    session = SimpleNamespace(get=mock_get)
+    result = await core.fetch_tile(session, "fake_panoid", 0, 0, 3)
+    assert result is None
 
 
 @pytest.mark.asyncio
-async def test_fetch_tile_failure():
+async def test_fetch_tile_failure(monkeypatch):
     """
     Test fetch_tile behavior when network requests fail.
 
-    Ensures the function returns None after retries.
+    Ensures the function returns None after retries. `asyncio.sleep` is stubbed
+    so the retry path costs no wall time.
     """
-    session = AsyncMock()
-    mock_response = AsyncMock()
-    mock_response.__aenter__.side_effect = Exception("Network error")
-    session.get.return_value = mock_response
+    sleep = AsyncMock()
+    monkeypatch.setattr(core.asyncio, "sleep", sleep)
+
+    class FailingResponse:
+        async def __aenter__(self):
+            raise RuntimeError("Network error")
+
+        async def __aexit__(self, exc_type, exc_val, exc_tb):
+            pass
+
+    session = SimpleNamespace(get=lambda *args, **kwargs: FailingResponse())
 
     result = await core.fetch_tile(session, "fake_panoid", 0, 0, 3, retries=2, backoff=0)
     assert result is None
+    sleep.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_fetch_tile_rate_limited_then_success():
+    """
+    Test fetch_tile on a 429 response.
+
+    The shared gate must be closed for `Retry-After` seconds, reopened, and the
+    tile retried successfully.
+    """
+    statuses = [429, 200]
+
+    class MockResponse:
+        def __init__(self, status):
+            self.status = status
+            self.headers = {"Content-Length": "1024", "Retry-After": "0"}
+
+        async def read(self):
+            return dummy_image_bytes()
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc_val, exc_tb):
+            pass
+
+    class MockSession:
+        def get(self, *args, **kwargs):
+            return MockResponse(statuses.pop(0))
+
+    gate = asyncio.Event()
+    gate.set()
+
+    result = await core.fetch_tile(MockSession(), "fake_panoid", 0, 0, 3, backoff=0, rate_limit_gate=gate)
+    assert result is not None
+    assert gate.is_set()
+    assert statuses == []
+
+
+@pytest.mark.asyncio
+async def test_fetch_tile_final_attempt_rate_limits_shrink_once():
+    """
+    Test concurrent 429s on the final attempt.
+
+    The first one must close the shared gate, so the limiter is shrunk once
+    for the pause instead of once per rate limited tile.
+    """
+    class MockResponse:
+        status = 429
+        headers = {"Retry-After": "1"}
+
+        async def __aenter__(self):
+            # yield so every request is in flight before the first 429 lands
+            await asyncio.sleep(0)
+            return self
+
+        async def __aexit__(self, exc_type, exc_val, exc_tb):
+            pass
+
+    session = SimpleNamespace(get=lambda *args, **kwargs: MockResponse())
+    gate = asyncio.Event()
+    gate.set()
+    limiter = core.AdaptiveSemaphore(max_limit=32)
+
+    results = await asyncio.gather(*(
+        core.fetch_tile(session, "fake_panoid", x, 0, 3, retries=1, rate_limit_gate=gate, limiter=limiter)
+        for x in range(10)
+    ))
+    assert results == [None] * 10
+    assert not gate.is_set()
+    assert limiter.limit == 16
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("3", 3),
+    (None, 0.5),
+    ("soon", 0.5),
+    ("inf", 0.5),
+    ("1e9", 0.5),
+    ("-5", 0),
+    ("100000", core.MAX_RETRY_AFTER),
+])
+def test_retry_after_parsing(value, expected):
+    """
+    Test `Retry-After` parsing: only integer seconds are accepted, anything else
+    falls back to the backoff, and the result is clamped to `MAX_RETRY_AFTER`.
+    """
+    assert core._retry_after(value, 0.5) == expected
+
+
+@pytest.mark.parametrize("num_bytes, expected", [
+    (0, "0.00 B"),
+    (0.5, "0.50 B"),
+    (1023, "1023.00 B"),
+    (1536, "1.50 KB"),
+    (3 * 1024 ** 2, "3.00 MB"),
+])
+def test_format_size(num_bytes, expected):
+    """
+    Test `format_size` picks the right unit, including sub-byte values.
+    """
+    assert format_size(num_bytes) == expected
+
+
+def test_save_img_failed_encode_leaves_no_file(tmp_path):
+    """
+    Test that a failed JPEG encode doesn't leave a partial `.jpg` behind.
+    """
+    with pytest.raises(OSError):
+        save_img(Image.new("RGBA", (1, 1)), str(tmp_path), "fake_panoid", 0)
+    assert not (tmp_path / "panos_z0" / "fake_panoid.jpg").exists()
+
+
+@pytest.mark.asyncio
+async def test_adaptive_semaphore_limits_and_adapts():
+    """
+    Test AdaptiveSemaphore admission and AIMD limit changes.
+
+    Holders beyond the limit wait until a slot frees up or the limit grows,
+    and `decrease` shrinks the limit multiplicatively down to `min_limit`.
+    """
+    sem = core.AdaptiveSemaphore(max_limit=4, initial_limit=1)
+
+    await sem.acquire()
+    waiter = asyncio.create_task(sem.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    sem.increase()
+    await asyncio.sleep(0)
+    assert waiter.done()
+    assert sem.limit == 2
+
+    sem.release()
+    sem.release()
+    for _ in range(5):
+        sem.increase()
+    assert sem.limit == 4
+
+    sem.decrease()
+    assert sem.limit == 2
+    for _ in range(5):
+        sem.decrease()
+    assert sem.limit == 1
 
 
 @pytest.mark.asyncio
@@ -180,20 +362,31 @@ async def test_process_panoid_success(monkeypatch, tmp_path):
     assert expected_file.exists()
 
 
-@pytest.mark.parametrize("zoom_level", [0, 1, 2, 3, 4, 5])
+@pytest.mark.parametrize("zoom_level", [
+    0,
+    pytest.param(1, marks=pytest.mark.slow),
+    2,
+    3,
+    pytest.param(4, marks=pytest.mark.slow),
+    pytest.param(5, marks=pytest.mark.slow),
+])
 @pytest.mark.asyncio
 async def test_different_zoom_levels(zoom_level, tmp_path):
     """
     Test process_panoid across different zoom levels with mocked tiles.
 
     Ensures tiles and image metadata are correctly calculated for each zoom level.
+    Zoom 0, 2 and 3 cover every `determine_dimensions` branch; the remaining
+    levels are marked `slow` and run with `-m slow`.
     """
     async def fake_fetch_tile(session, 
                               panoid, 
                               x, 
                               y, 
                               zl, **kwargs):
-        return x, y, dummy_image((512, 512), (100 + x * 10, 100 + y * 10, 150))
+        # Small tiles: only tile positions/counts are asserted, and a shared image
+        # can't be reused because stitch_tiles closes every tile it pastes
+        return x, y, dummy_image((16, 16), (100 + x * 10, 100 + y * 10, 150))
 
     def sync_black_percentage(tile):
         return 50.0
@@ -206,6 +399,7 @@ async def test_different_zoom_levels(zoom_level, tmp_path):
     panoid = f"fake_panoid_z{zoom_level}"
 
     with patch.object(core, "fetch_tile", fake_fetch_tile), \
+         patch.object(core, "save_img", fake_save_img), \
          patch("gsvpd.core.black_percentage", sync_black_percentage), \
          patch("gsvpd.core.has_black_bottom", sync_has_black_bottom):
         executor = None
@@ -255,7 +449,56 @@ async def test_process_panoid_no_tiles(monkeypatch, tmp_path):
 
 
 @pytest.mark.asyncio
-async def test_fetch_panos_with_failures(tmp_path, monkeypatch):
+async def test_process_panoid_tile_concurrency(monkeypatch, tmp_path):
+    """
+    Test that process_panoid never exceeds `tile_concurrency` in-flight tile fetches.
+    """
+    in_flight = 0
+    peak = 0
+
+    async def fake_fetch_tile(session, panoid, x, y, zoom_level, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return x, y, dummy_image((512, 512))
+
+    monkeypatch.setattr(core, "fetch_tile", fake_fetch_tile)
+    monkeypatch.setattr(core, "save_img", fake_save_img)
+
+    result = await core.process_panoid(None, "fake_panoid", asyncio.Semaphore(1), None, 3, tmp_path,
+                                       tile_concurrency=2)
+    assert result is not None
+    assert peak == 2
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def shared_connector():
+    """
+    One TCP connector shared by the `fetch_panos` tests in this module.
+
+    The tests pass `close_connector=False`, so the connector survives across
+    tests and is closed once at module teardown.
+    """
+    connector = core.aiohttp.TCPConnector(limit=10, limit_per_host=10)
+    yield connector
+    await connector.close()
+
+
+@pytest.fixture(scope="module")
+def sem_pano_10():
+    """
+    Pano semaphore (limit 10) shared by the `fetch_panos` tests.
+
+    Safe to share: every test releases all permits and runs on the same
+    module-scoped event loop.
+    """
+    return asyncio.Semaphore(10)
+
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_fetch_panos_with_failures(tmp_path, monkeypatch, shared_connector, sem_pano_10):
     """
     Test fetch_panos with some panoramas failing.
 
@@ -267,18 +510,17 @@ async def test_fetch_panos_with_failures(tmp_path, monkeypatch):
         return x, y, dummy_image((512, 512))
 
     monkeypatch.setattr(core, "fetch_tile", fake_fetch_tile)
+    monkeypatch.setattr(core, "save_img", fake_save_img)
     panoids = ["panoid1", "panoid2", "panoid3"]
 
-    sem_pano = asyncio.Semaphore(10)
-    connector = core.aiohttp.TCPConnector(limit=10, limit_per_host=10)
-
     total_panos, successful_panos, output_dir = await core.fetch_panos(
-        sem_pano,
-        connector,
+        sem_pano_10,
+        shared_connector,
         max_workers=2,
         zoom_level=3,
         panoids=panoids,
-        output_dir=str(tmp_path)
+        output_dir=str(tmp_path),
+        close_connector=False
     )
 
     assert total_panos == 3
@@ -290,8 +532,8 @@ async def test_fetch_panos_with_failures(tmp_path, monkeypatch):
     assert not (tmp_path / "panos_z3" / "panoid2.jpg").exists()
 
 
-@pytest.mark.asyncio
-async def test_fetch_panos_empty_dataset(tmp_path):
+@pytest.mark.asyncio(loop_scope="module")
+async def test_fetch_panos_empty_dataset(tmp_path, shared_connector, sem_pano_10):
     """
     Test fetch_panos when given an empty list of panoids.
 
@@ -299,16 +541,14 @@ async def test_fetch_panos_empty_dataset(tmp_path):
     """
     panoids = []
 
-    sem_pano = asyncio.Semaphore(10)
-    connector = core.aiohttp.TCPConnector(limit=10, limit_per_host=10)
-
     total_panos, successful_panos, output_dir = await core.fetch_panos(
-        sem_pano,
-        connector,
+        sem_pano_10,
+        shared_connector,
         max_workers=2,
         zoom_level=3,
         panoids=panoids,
-        output_dir=str(tmp_path)
+        output_dir=str(tmp_path),
+        close_connector=False
     )
 
     assert total_panos == 0
@@ -316,8 +556,8 @@ async def test_fetch_panos_empty_dataset(tmp_path):
     assert output_dir == str(tmp_path)
 
 
-@pytest.mark.asyncio
-async def test_fetch_panos_all_failures(tmp_path, monkeypatch):
+@pytest.mark.asyncio(loop_scope="module")
+async def test_fetch_panos_all_failures(tmp_path, monkeypatch, shared_connector, sem_pano_10):
     """
     Test fetch_panos when all panorama fetches fail.
 
@@ -329,16 +569,14 @@ async def test_fetch_panos_all_failures(tmp_path, monkeypatch):
     monkeypatch.setattr(core, "fetch_tile", fake_fetch_tile)
     panoids = ["fail1", "fail2", "fail3"]
 
-    sem_pano = asyncio.Semaphore(10)
-    connector = core.aiohttp.TCPConnector(limit=10, limit_per_host=10)
-
     total_panos, successful_panos, output_dir = await core.fetch_panos(
-        sem_pano,
-        connector,
+        sem_pano_10,
+        shared_connector,
         max_workers=2,
         zoom_level=3,
         panoids=panoids,
-        output_dir=str(tmp_path)
+        output_dir=str(tmp_path),
+        close_connector=False
     )
 
     assert total_panos == 3
@@ -363,4 +601,31 @@ async def test_determine_dimensions_fallback():
     img = Image.open(BytesIO(dummy_image_bytes()))
     tiles = [(0, 0, img)]
     result = await core.determine_dimensions(None, tiles, 3, 2, 2)
-    assert result == TILE_COUNT_TO_SIZE.get((2, 2))
\ No newline at end of file
+    assert result == TILE_COUNT_TO_SIZE.get((2, 2))
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_fetch_panos_streams_iterable(tmp_path, monkeypatch, shared_connector, sem_pano_10):
+    """
+    Test fetch_panos with a generator of panoids and fewer workers than panoids.
+
+    Ensures the iterable is consumed lazily through the queue and every panoid is counted.
+    """
+    async def fake_fetch_tile(session, panoid, x, y, zoom_level, **kwargs):
+        return None
+
+    monkeypatch.setattr(core, "fetch_tile", fake_fetch_tile)
+    panoids = (f"panoid{i}" for i in range(5))
+
+    total_panos, successful_panos, _ = await core.fetch_panos(
+        sem_pano_10,
+        shared_connector,
+        max_workers=2,
+        zoom_level=3,
+        panoids=panoids,
+        output_dir=str(tmp_path),
+        pano_workers=2,
+        close_connector=False
+    )
+
+    assert total_panos == 5
+    assert successful_panos == 0
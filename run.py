@@ -1,8 +1,14 @@
 import asyncio
-import aiohttp
+import itertools
+from PIL import Image
 from rich import print
 
-from gsvpd import fetch_panos
+try:
+    import uvloop  # faster event loop, not available on Windows
+except ImportError:
+    uvloop = None
+
+from gsvpd import AdaptiveSemaphore, create_connector, fetch_panos
 from gsvpd import (
     open_dataset,
     parse_args,
@@ -13,20 +19,31 @@ async def main(args) -> tuple[int, int, str]:
     dataset = open_dataset(args.dataset)
 
     if limit:= args.limit: 
-        dataset = dataset[:limit]
+        dataset = itertools.islice(dataset, limit)
 
-    sem_pano = asyncio.Semaphore(args.max_pano)
-    connector = aiohttp.TCPConnector(limit_per_host=args.conn_limit)
+    # --max-pano is the upper bound, the limit adapts to rate limiting below it
+    sem_pano = AdaptiveSemaphore(max_limit=args.max_pano, initial_limit=min(8, args.max_pano))
+    connector = create_connector(limit_per_host=args.conn_limit)
 
-    return await fetch_panos(sem_pano, connector, args.workers, args.zoom, dataset, args.output)
+    return await fetch_panos(
+        sem_pano, connector, args.workers, args.zoom, dataset, args.output,
+        tile_concurrency=args.max_tile, pano_workers=args.max_pano
+    )
 
 
 if __name__ == "__main__":
     try:
         args = parse_args() 
 
+        if uvloop is not None:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+        # PIL loads its JPEG plugin on the first Image.open; do it now, not inside the first tile burst
+        Image.preinit()
+
         with timer() as t:
-            total_panos, successful_panos, output_dir = asyncio.run(main(args))
+            # debug off even under PYTHONASYNCIODEBUG / -X dev, no per-task coroutine tracking
+            total_panos, successful_panos, output_dir = asyncio.run(main(args), debug=False)
 
         print(f"\n[gray]{'-' * 85}[/]")
         print(f"\n[orange1]| Processed [green]{successful_panos}/{total_panos}[/] panos in [green]{t.time_elapsed}[/][/]")